@@ -1,12 +1,34 @@
 # /app/app/audit_service.py
 
 import random
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 # FIX: Use relative import for the sibling module audit_categories
 from .audit_categories import AUDIT_CATEGORIES 
+from .html_analyzer import collect_results, create_visitors, metric_names, status_from_ratio
+from .waterfall import build_waterfall
 
 # Define the possible audit outcomes
 AUDIT_STATUSES = ['Excellent', 'Good', 'Fair', 'Poor', 'N/A']
 
+# Metrics computed from the subresource waterfall instead of being simulated
+WATERFALL_METRICS = [
+    "Time to First Byte (TTFB)", "Server Response Time", "Resource Compression (Gzip/Brotli)",
+    "Image Optimization and Next-Gen Formats (WebP)", "Effective Caching Policy",
+]
+
+# Millisecond upper bounds for Excellent / Good / Fair; anything slower is Poor
+TTFB_THRESHOLDS_MS = (200, 800, 1800)
+SERVER_RESPONSE_THRESHOLDS_MS = (100, 300, 600)
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/x-javascript', 'application/json',
+                      'application/xml', 'image/svg+xml', 'font/ttf', 'font/otf')
+COMPRESSED_ENCODINGS = ('gzip', 'br', 'deflate', 'zstd')
+MIN_COMPRESSIBLE_BYTES = 1024
+NEXT_GEN_IMAGE_TYPES = ('image/webp', 'image/avif')
+MIN_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
 class AuditService:
 
     @staticmethod
@@ -14,21 +36,117 @@ class AuditService:
         weights = [4, 4, 3, 2, 1] 
         return random.choices(AUDIT_STATUSES, weights=weights, k=1)[0]
 
+    @staticmethod
+    def _status_from_ms(value: float, thresholds: tuple) -> str:
+        excellent, good, fair = thresholds
+        if value <= excellent: return 'Excellent'
+        if value <= good: return 'Good'
+        if value <= fair: return 'Fair'
+        return 'Poor'
+
+    @staticmethod
+    def _cache_ttl_seconds(resource: dict) -> int:
+        cache_control = resource["cache_control"].lower()
+        if 'no-store' in cache_control or 'no-cache' in cache_control:
+            return 0
+        match = re.search(r'(?:s-maxage|max-age)\s*=\s*"?(\d+)', cache_control)
+        if match:
+            return int(match.group(1))
+        try:
+            expires = parsedate_to_datetime(resource["expires"])
+            served = parsedate_to_datetime(resource["date"]) if resource["date"] else datetime.now(timezone.utc)
+            return max(0, int((expires - served).total_seconds()))
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _waterfall_metric_checks(waterfall: dict) -> dict:
+        """Returns {metric: (status, suggestion)} for every metric in WATERFALL_METRICS."""
+        page = waterfall["page"]
+        if waterfall["error"]:
+            reason = f"Page could not be fetched ({waterfall['error']})."
+            return {metric: ('N/A', reason) for metric in WATERFALL_METRICS}
+
+        checks = {}
+        resources = [r for r in waterfall["resources"] if not r["error"] and r["status"] == 200]
+
+        checks["Time to First Byte (TTFB)"] = (
+            AuditService._status_from_ms(page["ttfb_ms"], TTFB_THRESHOLDS_MS),
+            f"TTFB was {page['ttfb_ms']} ms (including {page['redirects']} redirect(s)); aim for under 800 ms.",
+        )
+        checks["Server Response Time"] = (
+            AuditService._status_from_ms(page["wait_ms"], SERVER_RESPONSE_THRESHOLDS_MS),
+            f"Server took {page['wait_ms']} ms to respond after the request was sent; aim for under 300 ms.",
+        )
+
+        compressible = [
+            r for r in [dict(page, status=200)] + resources
+            if r["content_type"].startswith(COMPRESSIBLE_TYPES) and r["transfer_size"] >= MIN_COMPRESSIBLE_BYTES
+        ]
+        uncompressed = [r["final_url"] for r in compressible if r["content_encoding"] not in COMPRESSED_ENCODINGS]
+        checks["Resource Compression (Gzip/Brotli)"] = (
+            status_from_ratio(len(compressible) - len(uncompressed), len(compressible)),
+            f"{len(uncompressed)} of {len(compressible)} text resources served without Gzip/Brotli."
+            + (f" e.g. {uncompressed[0]}" if uncompressed else ""),
+        )
+
+        images = [r for r in resources if r["type"] == "image" and r["content_type"].startswith('image/')
+                  and r["content_type"] != 'image/svg+xml']
+        legacy = [r["final_url"] for r in images if r["content_type"] not in NEXT_GEN_IMAGE_TYPES]
+        checks["Image Optimization and Next-Gen Formats (WebP)"] = (
+            status_from_ratio(len(images) - len(legacy), len(images)),
+            f"{len(legacy)} of {len(images)} raster images are not served as WebP/AVIF."
+            + (f" e.g. {legacy[0]}" if legacy else ""),
+        )
+
+        short_lived = [r["final_url"] for r in resources
+                       if AuditService._cache_ttl_seconds(r) < MIN_CACHE_TTL_SECONDS]
+        checks["Effective Caching Policy"] = (
+            status_from_ratio(len(resources) - len(short_lived), len(resources)),
+            f"{len(short_lived)} of {len(resources)} static resources are cached for less than 30 days."
+            + (f" e.g. {short_lived[0]}" if short_lived else ""),
+        )
+
+        return checks
+
+    @staticmethod
+    def _html_metric_checks(waterfall: dict, visitors: list) -> dict:
+        """Returns {metric: (status, suggestion)} from the analyzer pass over the page HTML."""
+        if waterfall["error"]:
+            reason = f"Page could not be fetched ({waterfall['error']})."
+            return {metric: ('N/A', reason) for metric in metric_names()}
+        if waterfall["html_error"]:
+            reason = f"Page HTML could not be analyzed ({waterfall['html_error']})."
+            return {metric: ('N/A', reason) for metric in metric_names()}
+        return {
+            metric: (result["status"], result["suggestion"])
+            for metric, result in collect_results(visitors).items()
+        }
+
     @staticmethod
     def run_audit(url: str):
         metrics_status_map = {}
         categories_result = {}
 
+        visitors = create_visitors()
+        waterfall = build_waterfall(url, visitors=visitors)
+        measured_checks = AuditService._waterfall_metric_checks(waterfall)
+        measured_checks.update(AuditService._html_metric_checks(waterfall, visitors))
+
         for category, info in AUDIT_CATEGORIES.items():
             categories_result[category] = {"description": info["desc"], "items": []}
             
             for metric in info["metrics"]:
-                status = AuditService._simulate_metric_check(metric)
+                if metric in measured_checks:
+                    status, suggestion = measured_checks[metric]
+                else:
+                    status = AuditService._simulate_metric_check(metric)
+                    suggestion = f"Check documentation for '{metric}'."
                 metrics_status_map[metric] = status
                 categories_result[category]["items"].append({
                     "name": metric,
                     "status": status,
-                    "suggestion": f"Check documentation for '{metric}'."
+                    "suggestion": suggestion
                 })
 
         scores = AuditService.calculate_score(metrics_status_map)
@@ -36,7 +154,8 @@ class AuditService:
             "url": url,
             "metrics_map": metrics_status_map,
             "categories": categories_result,
-            "scores": scores
+            "scores": scores,
+            "waterfall": waterfall
         }
 
     @staticmethod
@@ -0,0 +1,1025 @@
+# /app/app/html_analyzer.py
+
+"""
+Single-pass streaming HTML analyzer for the SEO, Accessibility and Best Practices metrics.
+
+The document is fed in chunks to one event-based parser which dispatches every tag, text
+and declaration event to all registered visitors at once. Visitors keep counters and
+capped samples only, and <script>/<style> content is passed on in MAX_CDATA_BUFFER
+pieces, so memory does not grow with page size. The one exception is a single tag or
+comment, which html.parser holds whole until it is closed.
+"""
+
+import html
+import json
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+# --- Analyzer Limits ---
+MAX_TRACKED_IDS = 5000        # Control/label ids kept for label association
+MAX_SAMPLES = 3               # Offending examples kept per metric
+MAX_TEXT_CHARS = 1024         # Characters kept from <title>
+MAX_JSON_LD_CHARS = 64 * 1024 # Characters kept per JSON-LD block
+ABOVE_THE_FOLD_MEDIA = 3      # Leading images/iframes assumed visible on load
+MAX_CDATA_BUFFER = 64 * 1024  # <script>/<style> characters buffered before being flushed as text
+CDATA_TAIL_CHARS = 64         # Kept back on flush so a split closing tag is still recognised
+
+VISITOR_CLASSES = []
+
+
+def register_visitor(cls):
+    """Class decorator adding a visitor to the set run on every analyzed page."""
+    VISITOR_CLASSES.append(cls)
+    return cls
+
+
+def create_visitors() -> list:
+    return [cls() for cls in VISITOR_CLASSES]
+
+
+def status_from_ratio(passed: int, total: int) -> str:
+    if total == 0: return 'N/A'
+    ratio = passed / total
+    if ratio >= 1: return 'Excellent'
+    if ratio >= 0.75: return 'Good'
+    if ratio >= 0.5: return 'Fair'
+    return 'Poor'
+
+
+def status_from_count(issues: int, limits: tuple = (0, 2, 5)) -> str:
+    """Maps an issue count to a status; `limits` are the maxima for Excellent / Good / Fair."""
+    excellent, good, fair = limits
+    if issues <= excellent: return 'Excellent'
+    if issues <= good: return 'Good'
+    if issues <= fair: return 'Fair'
+    return 'Poor'
+
+
+def _examples(samples: list) -> str:
+    return f" e.g. {', '.join(samples)}" if samples else ""
+
+
+class HTMLVisitor:
+    """
+    Base class for analyzer visitors.
+
+    `tags` limits which start/end tags are dispatched to the visitor (None means all),
+    and `wants_data` opts in to text events. `metrics` names the AUDIT_CATEGORIES
+    metrics the visitor reports on in `results()`. `begin` receives the analyzer
+    before the first event, for visitors that resolve URLs against its base_url.
+    """
+    metrics = ()
+    tags = None
+    wants_data = False
+    error = None                  # Set by the analyzer if one of the visitor's handlers raised
+
+    def __init__(self):
+        self.samples = []
+
+    def _sample(self, value: str):
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value[:120])
+
+    def begin(self, analyzer: 'StreamingHTMLAnalyzer'): pass
+    def handle_starttag(self, tag: str, attrs: dict): pass
+    def handle_endtag(self, tag: str): pass
+    def handle_data(self, data: str): pass
+    def handle_decl(self, decl: str): pass
+
+    def results(self) -> dict:
+        """Returns {metric: {"status", "suggestion", "details"}} for each name in `metrics`."""
+        return {}
+
+    def _result(self, status: str, suggestion: str, **details) -> dict:
+        return {"status": status, "suggestion": suggestion, "details": details}
+
+
+class StreamingHTMLAnalyzer(HTMLParser):
+    """
+    Feeds one parse of the document to every visitor; call feed() per chunk, then close().
+
+    A visitor whose handler raises is recorded as failed and dropped from dispatch, so
+    one faulty heuristic cannot abort the pass for the others.
+    """
+
+    def __init__(self, page_url: str, visitors: list):
+        # Character references are dispatched as text so long runs are never held back.
+        super().__init__(convert_charrefs=False)
+        self.page_url = page_url
+        self.visitors = list(visitors)
+        self.chars_fed = 0
+        self._base_href = None
+        self._started = False
+        self._active = list(self.visitors)
+        self._rebuild_dispatch()
+
+    @property
+    def base_url(self) -> str:
+        """URL that relative links resolve against: the first <base href>, else the page URL."""
+        return urljoin(self.page_url, self._base_href) if self._base_href else self.page_url
+
+    @property
+    def page_host(self) -> str:
+        return urlsplit(self.page_url).hostname
+
+    def _rebuild_dispatch(self):
+        self._start_handlers = {}
+        self._end_handlers = {}
+        self._data_handlers = [v.handle_data for v in self._active if v.wants_data]
+        self._decl_handlers = [v.handle_decl for v in self._active]
+
+    def _handlers(self, cache: dict, tag: str, method: str) -> list:
+        handlers = cache.get(tag)
+        if handlers is None:
+            handlers = cache[tag] = [
+                getattr(v, method) for v in self._active if v.tags is None or tag in v.tags
+            ]
+        return handlers
+
+    def _fail(self, visitor, error: Exception):
+        visitor.error = f"{type(error).__name__}: {error}"
+        if visitor in self._active:
+            self._active.remove(visitor)
+            self._rebuild_dispatch()
+
+    def feed(self, data: str):
+        if not self._started:
+            self._started = True
+            for visitor in list(self._active):
+                try:
+                    visitor.begin(self)
+                except Exception as e:
+                    self._fail(visitor, e)
+        self.chars_fed += len(data)
+        super().feed(data)
+        if self.cdata_elem and len(self.rawdata) > MAX_CDATA_BUFFER:
+            # html.parser keeps all <script>/<style> content in rawdata until the closing
+            # tag arrives; hand it on as text now, keeping a tail for a split "</script>".
+            flushed, self.rawdata = self.rawdata[:-CDATA_TAIL_CHARS], self.rawdata[-CDATA_TAIL_CHARS:]
+            self.handle_data(flushed)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: (value or '') for name, value in attrs}
+        if tag == 'base' and self._base_href is None and attrs.get('href'):
+            self._base_href = attrs['href'].strip()
+        for handler in self._handlers(self._start_handlers, tag, 'handle_starttag'):
+            try:
+                handler(tag, attrs)
+            except Exception as e:
+                self._fail(handler.__self__, e)
+
+    def handle_endtag(self, tag):
+        for handler in self._handlers(self._end_handlers, tag, 'handle_endtag'):
+            try:
+                handler(tag)
+            except Exception as e:
+                self._fail(handler.__self__, e)
+
+    def handle_data(self, data):
+        for handler in self._data_handlers:
+            try:
+                handler(data)
+            except Exception as e:
+                self._fail(handler.__self__, e)
+
+    def handle_entityref(self, name):
+        self.handle_data(html.unescape(f"&{name};"))
+
+    def handle_charref(self, name):
+        self.handle_data(html.unescape(f"&#{name};"))
+
+    def handle_decl(self, decl):
+        for handler in self._decl_handlers:
+            try:
+                handler(decl)
+            except Exception as e:
+                self._fail(handler.__self__, e)
+
+    def results(self) -> dict:
+        return collect_results(self.visitors)
+
+
+def collect_results(visitors: list) -> dict:
+    """Returns one structured result per metric, keyed by metric name; failed visitors report N/A."""
+    combined = {}
+    for visitor in visitors:
+        if visitor.error is None:
+            try:
+                results = visitor.results()
+            except Exception as e:
+                visitor.error = f"{type(e).__name__}: {e}"
+        if visitor.error is not None:
+            results = {
+                metric: visitor._result('N/A', f"Analysis failed ({visitor.error}).")
+                for metric in visitor.metrics
+            }
+        for metric, result in results.items():
+            combined[metric] = dict(result, metric=metric)
+    return combined
+
+
+def analyze_html(chunks, page_url: str = '', visitors: list = None) -> dict:
+    """Runs the registered visitors over an iterable of str chunks and returns their results."""
+    analyzer = StreamingHTMLAnalyzer(page_url, visitors if visitors is not None else create_visitors())
+    for chunk in chunks:
+        analyzer.feed(chunk)
+    analyzer.close()
+    return analyzer.results()
+
+
+def metric_names() -> list:
+    return [metric for cls in VISITOR_CLASSES for metric in cls.metrics]
+
+
+# --- Accessibility ---
+
+@register_visitor
+class ImageAltVisitor(HTMLVisitor):
+    metrics = ("Alt Text on All Images (Informative vs. Decorative)", "Image Alt Attributes for SEO")
+    tags = frozenset({'img'})
+
+    def __init__(self):
+        super().__init__()
+        self.total = self.missing = self.decorative = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.total += 1
+        if 'alt' not in attrs:
+            self.missing += 1
+            self._sample(attrs.get('src', '<img>'))
+        elif not attrs['alt'].strip() or attrs.get('role') in ('presentation', 'none'):
+            self.decorative += 1
+
+    def results(self):
+        informative = self.total - self.missing - self.decorative
+        candidates = self.total - self.decorative
+        return {
+            self.metrics[0]: self._result(
+                status_from_ratio(self.total - self.missing, self.total),
+                f"{self.missing} of {self.total} images have no alt attribute; use alt=\"\" for decorative images."
+                + _examples(self.samples),
+                images=self.total, missing=self.missing, decorative=self.decorative,
+            ),
+            self.metrics[1]: self._result(
+                status_from_ratio(informative, candidates),
+                f"{informative} of {candidates} non-decorative images have descriptive alt text.",
+                images=self.total, informative=informative,
+            ),
+        }
+
+
+@register_visitor
+class NonTextContentVisitor(HTMLVisitor):
+    metrics = ("Non-Text Content Alternatives",)
+    tags = frozenset({'img', 'area', 'input', 'iframe', 'object', 'embed', 'svg'})
+
+    def __init__(self):
+        super().__init__()
+        self.total = self.missing = 0
+
+    def handle_starttag(self, tag, attrs):
+        labelled = bool(attrs.get('aria-label', '').strip() or attrs.get('aria-labelledby'))
+        if tag in ('img', 'area') or (tag == 'input' and attrs.get('type', '').lower() == 'image'):
+            ok = 'alt' in attrs or labelled
+        elif tag in ('iframe', 'object', 'embed'):
+            ok = bool(attrs.get('title', '').strip()) or labelled
+        elif tag == 'svg' and attrs.get('role') == 'img':
+            ok = labelled
+        else:
+            return
+        self.total += 1
+        if not ok:
+            self.missing += 1
+            self._sample(f"<{tag} {attrs.get('src') or attrs.get('data') or ''}>".replace(' >', '>'))
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_ratio(self.total - self.missing, self.total),
+            f"{self.missing} of {self.total} non-text elements lack a text alternative." + _examples(self.samples),
+            elements=self.total, missing=self.missing,
+        )}
+
+
+ARIA_ROLES = frozenset("""
+    alert alertdialog application article banner blockquote button caption cell checkbox code columnheader
+    combobox complementary contentinfo definition deletion dialog directory document emphasis feed figure
+    form generic grid gridcell group heading img insertion link list listbox listitem log main marquee math
+    menu menubar menuitem menuitemcheckbox menuitemradio meter navigation none note option paragraph
+    presentation progressbar radio radiogroup region row rowgroup rowheader scrollbar search searchbox
+    separator slider spinbutton status strong subscript superscript switch tab table tablist tabpanel term
+    textbox time timer toolbar tooltip tree treegrid treeitem
+""".split())
+
+ARIA_ATTRIBUTES = frozenset("""
+    aria-activedescendant aria-atomic aria-autocomplete aria-braillelabel aria-brailleroledescription
+    aria-busy aria-checked aria-colcount aria-colindex aria-colindextext aria-colspan aria-controls
+    aria-current aria-describedby aria-description aria-details aria-disabled aria-dropeffect
+    aria-errormessage aria-expanded aria-flowto aria-grabbed aria-haspopup aria-hidden aria-invalid
+    aria-keyshortcuts aria-label aria-labelledby aria-level aria-live aria-modal aria-multiline
+    aria-multiselectable aria-orientation aria-owns aria-placeholder aria-posinset aria-pressed
+    aria-readonly aria-relevant aria-required aria-roledescription aria-rowcount aria-rowindex
+    aria-rowindextext aria-rowspan aria-selected aria-setsize aria-sort aria-valuemax aria-valuemin
+    aria-valuenow aria-valuetext
+""".split())
+
+FOCUSABLE_TAGS = frozenset({'a', 'button', 'input', 'select', 'textarea', 'summary'})
+
+
+@register_visitor
+class AriaVisitor(HTMLVisitor):
+    metrics = ("ARIA Roles and Attributes Correctly Used",)
+
+    def __init__(self):
+        super().__init__()
+        self.elements = self.invalid = 0
+
+    def handle_starttag(self, tag, attrs):
+        role = attrs.get('role')
+        aria = [name for name in attrs if name.startswith('aria-')]
+        if role is None and not aria:
+            return
+        self.elements += 1
+        problem = None
+        if role is not None and not any(token in ARIA_ROLES for token in role.lower().split()):
+            problem = f'role="{role}"'
+        elif any(name not in ARIA_ATTRIBUTES for name in aria):
+            problem = next(name for name in aria if name not in ARIA_ATTRIBUTES)
+        elif attrs.get('aria-hidden') == 'true' and tag in FOCUSABLE_TAGS and attrs.get('tabindex') != '-1':
+            problem = f'aria-hidden on focusable <{tag}>'
+        if problem:
+            self.invalid += 1
+            self._sample(problem)
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_ratio(self.elements - self.invalid, self.elements),
+            f"{self.invalid} of {self.elements} elements using ARIA have an invalid role or attribute."
+            + _examples(self.samples),
+            elements=self.elements, invalid=self.invalid,
+        )}
+
+
+@register_visitor
+class KeyboardNavigationVisitor(HTMLVisitor):
+    metrics = ("Full Keyboard Navigation Support",)
+
+    def __init__(self):
+        super().__init__()
+        self.interactive = self.issues = 0
+
+    def handle_starttag(self, tag, attrs):
+        tabindex = attrs.get('tabindex')
+        clickable = 'onclick' in attrs
+        if tag not in FOCUSABLE_TAGS and not clickable and tabindex is None:
+            return
+        self.interactive += 1
+        if tabindex is not None and _int_or_zero(tabindex) > 0:
+            self._flag(f'<{tag} tabindex="{tabindex}">')
+        elif clickable and tag not in FOCUSABLE_TAGS and tabindex is None:
+            self._flag(f'<{tag} onclick> without tabindex')
+        elif tag == 'a' and clickable and 'href' not in attrs:
+            self._flag('<a onclick> without href')
+
+    def _flag(self, sample: str):
+        self.issues += 1
+        self._sample(sample)
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_ratio(self.interactive - self.issues, self.interactive),
+            f"{self.issues} of {self.interactive} interactive elements are unreachable by keyboard or use positive tabindex."
+            + _examples(self.samples),
+            interactive=self.interactive, issues=self.issues,
+        )}
+
+
+def _int_or_zero(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+LANDMARK_TAGS = ('main', 'nav', 'header', 'footer')
+
+
+@register_visitor
+class SemanticStructureVisitor(HTMLVisitor):
+    metrics = ("Semantic HTML Structure",)
+    tags = frozenset(LANDMARK_TAGS + ('article', 'section', 'aside'))
+
+    def __init__(self):
+        super().__init__()
+        self.counts = {}
+
+    def handle_starttag(self, tag, attrs):
+        self.counts[tag] = self.counts.get(tag, 0) + 1
+
+    def results(self):
+        present = [tag for tag in LANDMARK_TAGS if tag in self.counts]
+        missing = [f"<{tag}>" for tag in LANDMARK_TAGS if tag not in self.counts]
+        return {self.metrics[0]: self._result(
+            status_from_ratio(len(present), len(LANDMARK_TAGS)),
+            f"Missing landmark elements: {', '.join(missing)}." if missing else "All primary landmark elements are used.",
+            elements=dict(self.counts),
+        )}
+
+
+UNLABELLED_INPUT_TYPES = frozenset({'hidden', 'submit', 'button', 'reset', 'image'})
+
+
+@register_visitor
+class FormLabelVisitor(HTMLVisitor):
+    metrics = ("Form Labels Associated with Controls",)
+    tags = frozenset({'label', 'input', 'select', 'textarea'})
+
+    def __init__(self):
+        super().__init__()
+        self.label_depth = 0
+        self.controls = self.labelled = self.untracked = 0
+        self.pending_ids = set()
+        self.label_for = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'label':
+            self.label_depth += 1
+            if attrs.get('for') and len(self.label_for) < MAX_TRACKED_IDS:
+                self.label_for.add(attrs['for'])
+            return
+        if tag == 'input' and attrs.get('type', 'text').lower() in UNLABELLED_INPUT_TYPES:
+            return
+        self.controls += 1
+        if self.label_depth or attrs.get('aria-label', '').strip() or attrs.get('aria-labelledby') \
+                or attrs.get('title', '').strip():
+            self.labelled += 1
+        elif attrs.get('id'):
+            # A <label for> may come later in the document, so resolve at the end.
+            if len(self.pending_ids) < MAX_TRACKED_IDS:
+                self.pending_ids.add(attrs['id'])
+            else:
+                self.untracked += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'label' and self.label_depth:
+            self.label_depth -= 1
+
+    def results(self):
+        labelled = self.labelled + len(self.pending_ids & self.label_for)
+        checked = self.controls - self.untracked
+        return {self.metrics[0]: self._result(
+            status_from_ratio(labelled, checked),
+            f"{checked - labelled} of {checked} form controls have no associated label.",
+            controls=self.controls, labelled=labelled, untracked=self.untracked,
+        )}
+
+
+@register_visitor
+class HeadingVisitor(HTMLVisitor):
+    metrics = ("Heading Structure Logical (<H1> present and unique)", "Heading Tags Hierarchy (H1, H2, H3)")
+    tags = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+
+    def __init__(self):
+        super().__init__()
+        self.h1 = self.headings = self.skips = 0
+        self.previous = 0
+
+    def handle_starttag(self, tag, attrs):
+        level = int(tag[1])
+        self.headings += 1
+        self.h1 += level == 1
+        if level > self.previous + 1:
+            self.skips += 1
+            self._sample(f"h{self.previous or '-'} -> h{level}")
+        self.previous = level
+
+    def results(self):
+        if self.h1 == 1:
+            h1_status, h1_note = 'Excellent', "Exactly one <h1> is present."
+        elif self.h1 == 0:
+            h1_status, h1_note = 'Poor', "No <h1> found; add one describing the page."
+        else:
+            h1_status, h1_note = 'Fair', f"{self.h1} <h1> elements found; keep a single <h1>."
+        return {
+            self.metrics[0]: self._result(h1_status, h1_note, h1_count=self.h1),
+            self.metrics[1]: self._result(
+                status_from_ratio(self.headings - self.skips, self.headings),
+                f"{self.skips} of {self.headings} headings skip a level." + _examples(self.samples),
+                headings=self.headings, skipped_levels=self.skips,
+            ),
+        }
+
+
+LANG_PATTERN = re.compile(r'^[a-zA-Z]{2,3}(-[a-zA-Z0-9]{2,8})*$')
+
+
+@register_visitor
+class LanguageVisitor(HTMLVisitor):
+    metrics = ("Page Language Specified (lang attribute)",)
+    tags = frozenset({'html'})
+
+    def __init__(self):
+        super().__init__()
+        self.lang = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.lang is None:
+            self.lang = attrs.get('lang', '').strip()
+
+    def results(self):
+        if not self.lang:
+            status, note = 'Poor', "Add a lang attribute to the <html> element."
+        elif LANG_PATTERN.match(self.lang):
+            status, note = 'Excellent', f'Page language is "{self.lang}".'
+        else:
+            status, note = 'Fair', f'lang="{self.lang}" is not a valid BCP 47 language tag.'
+        return {self.metrics[0]: self._result(status, note, lang=self.lang or None)}
+
+
+# --- SEO ---
+
+@register_visitor
+class MetaDescriptionVisitor(HTMLVisitor):
+    metrics = ("Meta Description Present and Unique",)
+    tags = frozenset({'meta'})
+
+    def __init__(self):
+        super().__init__()
+        self.lengths = []
+
+    def handle_starttag(self, tag, attrs):
+        if attrs.get('name', '').lower() == 'description' and len(self.lengths) < MAX_SAMPLES + 1:
+            self.lengths.append(len(attrs.get('content', '').strip()))
+
+    def results(self):
+        if not self.lengths or not any(self.lengths):
+            status, note = 'Poor', "Add a meta description of 50-160 characters."
+        elif len(self.lengths) > 1:
+            status, note = 'Fair', f"{len(self.lengths)} meta descriptions found; keep exactly one."
+        elif self.lengths[0] < 25:
+            status, note = 'Fair', f"Meta description is only {self.lengths[0]} characters; aim for 50-160."
+        elif 50 <= self.lengths[0] <= 160:
+            status, note = 'Excellent', f"Meta description is {self.lengths[0]} characters."
+        else:
+            status, note = 'Good', f"Meta description is {self.lengths[0]} characters; aim for 50-160."
+        return {self.metrics[0]: self._result(status, note, count=len(self.lengths), lengths=self.lengths)}
+
+
+@register_visitor
+class TitleVisitor(HTMLVisitor):
+    metrics = ("Title Tag Length and Relevance",)
+    tags = frozenset({'title', 'svg'})
+    wants_data = True
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        self.svg_depth = 0
+        self.in_title = False
+        self.text = []
+        self.text_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'svg':
+            self.svg_depth += 1
+        elif not self.svg_depth:
+            self.count += 1
+            self.in_title = self.count == 1
+
+    def handle_endtag(self, tag):
+        if tag == 'svg' and self.svg_depth:
+            self.svg_depth -= 1
+        elif tag == 'title':
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title and self.text_chars < MAX_TEXT_CHARS:
+            self.text.append(data)
+            self.text_chars += len(data)
+
+    def results(self):
+        title = ' '.join(''.join(self.text).split())[:MAX_TEXT_CHARS]
+        if not title:
+            status, note = 'Poor', "Add a descriptive <title>."
+        elif self.count > 1:
+            status, note = 'Fair', f"{self.count} <title> elements found; keep exactly one."
+        elif 10 <= len(title) <= 60:
+            status, note = 'Excellent', f"Title is {len(title)} characters."
+        elif len(title) <= 70:
+            status, note = 'Good', f"Title is {len(title)} characters; aim for 10-60."
+        else:
+            status, note = 'Fair', f"Title is {len(title)} characters and will be truncated in results."
+        return {self.metrics[0]: self._result(status, note, title=title, count=self.count)}
+
+
+@register_visitor
+class CanonicalVisitor(HTMLVisitor):
+    metrics = ("Canonical Tags Correctly Used",)
+    tags = frozenset({'link'})
+
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if 'canonical' in attrs.get('rel', '').lower().split() and len(self.hrefs) < MAX_SAMPLES + 1:
+            self.hrefs.append(attrs.get('href', '').strip())
+
+    def results(self):
+        if not self.hrefs:
+            status, note = 'Fair', "No canonical link; add <link rel=\"canonical\"> to avoid duplicate content."
+        elif len(self.hrefs) > 1:
+            status, note = 'Poor', f"{len(self.hrefs)} canonical links found; search engines may ignore them all."
+        elif urlsplit(self.hrefs[0]).scheme in ('http', 'https'):
+            status, note = 'Excellent', f"Canonical URL is {self.hrefs[0]}."
+        elif self.hrefs[0]:
+            status, note = 'Good', "Canonical URL is relative; prefer an absolute URL."
+        else:
+            status, note = 'Poor', "Canonical link has an empty href."
+        return {self.metrics[0]: self._result(status, note, canonical=self.hrefs)}
+
+
+def _viewport_settings(content: str) -> dict:
+    settings = {}
+    for part in re.split(r'[,;]', content):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            settings[key.strip().lower()] = value.strip().lower()
+    return settings
+
+
+@register_visitor
+class ViewportVisitor(HTMLVisitor):
+    metrics = ("Mobile Friendly / Viewport Configured", "Responsive Design (Adapts to different screen sizes)")
+    tags = frozenset({'meta', 'img', 'source', 'link', 'style'})
+    wants_data = True
+
+    def __init__(self):
+        super().__init__()
+        self.viewport = None
+        self.in_style = False
+        self.signals = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta' and attrs.get('name', '').lower() == 'viewport' and self.viewport is None:
+            self.viewport = _viewport_settings(attrs.get('content', ''))
+        elif tag in ('img', 'source') and attrs.get('srcset'):
+            self.signals.add('srcset')
+        elif tag == 'link' and attrs.get('media') and attrs.get('media') != 'all':
+            self.signals.add('media stylesheets')
+        elif tag == 'style':
+            self.in_style = True
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self.in_style = False
+
+    def handle_data(self, data):
+        if self.in_style and '@media' in data:
+            self.signals.add('media queries')
+
+    def results(self):
+        viewport = self.viewport or {}
+        device_width = viewport.get('width') == 'device-width'
+        try:
+            max_scale = float(viewport.get('maximum-scale', '5'))
+        except ValueError:
+            max_scale = 5.0
+        zoom_locked = viewport.get('user-scalable') in ('no', '0') or max_scale < 2
+        if self.viewport is None:
+            status, note = 'Poor', "Add <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">."
+        elif not device_width:
+            status, note = 'Fair', "Viewport does not set width=device-width."
+        elif zoom_locked:
+            status, note = 'Good', "Viewport blocks user zoom; remove user-scalable=no / low maximum-scale."
+        else:
+            status, note = 'Excellent', "Viewport is configured for mobile devices."
+
+        signals = sorted(self.signals)
+        if not device_width:
+            responsive = 'Poor'
+        else:
+            responsive = 'Excellent' if len(signals) >= 2 else 'Good' if signals else 'Fair'
+        return {
+            self.metrics[0]: self._result(status, note, viewport=self.viewport),
+            self.metrics[1]: self._result(
+                responsive,
+                f"Responsive signals found: {', '.join(signals) or 'none'}.",
+                device_width=device_width, signals=signals,
+            ),
+        }
+
+
+@register_visitor
+class StructuredDataVisitor(HTMLVisitor):
+    metrics = ("Structured Data (Schema Markup) Implemented",)
+    wants_data = True
+
+    def __init__(self):
+        super().__init__()
+        self.microdata = 0
+        self.json_ld = self.json_ld_invalid = 0
+        self.in_json_ld = False
+        self.block = []
+        self.block_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if 'itemscope' in attrs or 'typeof' in attrs:
+            self.microdata += 1
+        if tag == 'script' and attrs.get('type', '').lower() == 'application/ld+json':
+            self.in_json_ld = True
+            self.block, self.block_chars = [], 0
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self.in_json_ld:
+            self.in_json_ld = False
+            self.json_ld += 1
+            if self.block_chars <= MAX_JSON_LD_CHARS:
+                try:
+                    json.loads(''.join(self.block))
+                except ValueError:
+                    self.json_ld_invalid += 1
+            self.block = []
+
+    def handle_data(self, data):
+        if self.in_json_ld:
+            self.block_chars += len(data)
+            if self.block_chars <= MAX_JSON_LD_CHARS:
+                self.block.append(data)
+
+    def results(self):
+        if self.json_ld and not self.json_ld_invalid:
+            status, note = 'Excellent', f"{self.json_ld} JSON-LD block(s) found."
+        elif self.json_ld:
+            status, note = 'Fair', f"{self.json_ld_invalid} of {self.json_ld} JSON-LD blocks are not valid JSON."
+        elif self.microdata:
+            status, note = 'Good', "Microdata/RDFa found; JSON-LD is the recommended format."
+        else:
+            status, note = 'Poor', "No structured data found; add schema.org JSON-LD."
+        return {self.metrics[0]: self._result(
+            status, note, json_ld=self.json_ld, json_ld_invalid=self.json_ld_invalid, microdata=self.microdata,
+        )}
+
+
+NON_DESCRIPTIVE_SEGMENT = re.compile(r'^(\d+|[0-9a-f]{8,}|[0-9a-f-]{32,36})$', re.IGNORECASE)
+
+
+@register_visitor
+class DescriptiveUrlVisitor(HTMLVisitor):
+    metrics = ("Descriptive URL Structure",)
+    tags = frozenset({'a'})
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = None
+        self.links = self.opaque = 0
+
+    def begin(self, analyzer):
+        self.analyzer = analyzer
+
+    def handle_starttag(self, tag, attrs):
+        href = attrs.get('href', '').strip()
+        if not href or href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+            return
+        parts = urlsplit(urljoin(self.analyzer.base_url, href))
+        if parts.hostname != self.analyzer.page_host:
+            return
+        self.links += 1
+        segments = [s for s in parts.path.split('/') if s]
+        if parts.query or '_' in parts.path or any(NON_DESCRIPTIVE_SEGMENT.match(s) for s in segments):
+            self.opaque += 1
+            self._sample(parts.path + (f"?{parts.query}" if parts.query else ''))
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_ratio(self.links - self.opaque, self.links),
+            f"{self.opaque} of {self.links} internal links use query strings, IDs or underscores."
+            + _examples(self.samples),
+            internal_links=self.links, non_descriptive=self.opaque,
+        )}
+
+
+# --- Best Practices ---
+
+@register_visitor
+class DoctypeVisitor(HTMLVisitor):
+    metrics = ("HTML Doctype Declared",)
+
+    def __init__(self):
+        super().__init__()
+        self.doctype = None
+        self.seen_tag = False
+
+    def handle_starttag(self, tag, attrs):
+        self.seen_tag = True
+
+    def handle_decl(self, decl):
+        if self.doctype is None and not self.seen_tag and decl.lower().startswith('doctype'):
+            self.doctype = ' '.join(decl.split()[1:])
+
+    def results(self):
+        if self.doctype is None:
+            status, note = 'Poor', "Add <!DOCTYPE html> as the first line to avoid quirks mode."
+        elif self.doctype.lower() == 'html':
+            status, note = 'Excellent', "HTML5 doctype declared."
+        else:
+            status, note = 'Fair', f"Legacy doctype \"{self.doctype[:80]}\"; use <!DOCTYPE html>."
+        return {self.metrics[0]: self._result(status, note, doctype=self.doctype)}
+
+
+DEPRECATED_TAGS = frozenset({
+    'acronym', 'applet', 'basefont', 'big', 'blink', 'center', 'dir', 'font', 'frame', 'frameset',
+    'isindex', 'marquee', 'noframes', 'strike', 'tt',
+})
+LEGACY_SCRIPT_PATTERN = re.compile(r'jquery[-.]?1\.|angular(?:\.min)?\.js|prototype(?:\.min)?\.js|mootools', re.IGNORECASE)
+
+
+@register_visitor
+class DeprecatedMarkupVisitor(HTMLVisitor):
+    metrics = ("No Deprecated APIs or Frameworks",)
+    tags = DEPRECATED_TAGS | {'script'}
+
+    def __init__(self):
+        super().__init__()
+        self.issues = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'script':
+            if not LEGACY_SCRIPT_PATTERN.search(attrs.get('src', '')):
+                return
+            self._sample(attrs['src'])
+        else:
+            self._sample(f"<{tag}>")
+        self.issues += 1
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_count(self.issues),
+            f"{self.issues} deprecated elements or legacy libraries found." + _examples(self.samples),
+            issues=self.issues,
+        )}
+
+
+@register_visitor
+class FaviconVisitor(HTMLVisitor):
+    metrics = ("Favicon Present (all sizes)",)
+    tags = frozenset({'link'})
+
+    def __init__(self):
+        super().__init__()
+        self.icon = self.touch_icon = False
+        self.sizes = set()
+
+    def handle_starttag(self, tag, attrs):
+        rel = attrs.get('rel', '').lower().split()
+        if 'icon' in rel:
+            self.icon = True
+        if 'apple-touch-icon' in rel:
+            self.touch_icon = True
+        if ('icon' in rel or 'apple-touch-icon' in rel) and attrs.get('sizes') and len(self.sizes) < 10:
+            self.sizes.add(attrs['sizes'])
+
+    def results(self):
+        if self.icon and self.touch_icon:
+            status, note = 'Excellent', "Favicon and Apple touch icon declared."
+        elif self.icon:
+            status, note = 'Good', "Favicon declared; add an apple-touch-icon for mobile home screens."
+        elif self.touch_icon:
+            status, note = 'Fair', "Only an apple-touch-icon is declared; add <link rel=\"icon\">."
+        else:
+            status, note = 'Poor', "No favicon declared in the HTML."
+        return {self.metrics[0]: self._result(status, note, sizes=sorted(self.sizes))}
+
+
+@register_visitor
+class ThirdPartyScriptVisitor(HTMLVisitor):
+    metrics = ("Third-Party Scripts Scanned for Security",)
+    tags = frozenset({'script'})
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = None
+        self.third_party = self.without_integrity = 0
+
+    def begin(self, analyzer):
+        self.analyzer = analyzer
+
+    def handle_starttag(self, tag, attrs):
+        src = attrs.get('src', '').strip()
+        if not src:
+            return
+        host = urlsplit(urljoin(self.analyzer.base_url, src)).hostname
+        if host is None or host == self.analyzer.page_host:
+            return
+        self.third_party += 1
+        if not attrs.get('integrity'):
+            self.without_integrity += 1
+            self._sample(host)
+
+    def results(self):
+        if not self.third_party:
+            return {self.metrics[0]: self._result('Excellent', "No third-party scripts loaded.", third_party=0)}
+        return {self.metrics[0]: self._result(
+            status_from_ratio(self.third_party - self.without_integrity, self.third_party),
+            f"{self.without_integrity} of {self.third_party} third-party scripts lack Subresource Integrity."
+            + _examples(self.samples),
+            third_party=self.third_party, without_integrity=self.without_integrity,
+        )}
+
+
+@register_visitor
+class LazyLoadingVisitor(HTMLVisitor):
+    metrics = ("Lazy Loading for Offscreen Images/Iframes",)
+    tags = frozenset({'img', 'iframe'})
+
+    def __init__(self):
+        super().__init__()
+        self.media = self.eager = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.media += 1
+        if self.media > ABOVE_THE_FOLD_MEDIA and attrs.get('loading', '').lower() != 'lazy':
+            self.eager += 1
+
+    def results(self):
+        offscreen = max(0, self.media - ABOVE_THE_FOLD_MEDIA)
+        return {self.metrics[0]: self._result(
+            status_from_ratio(offscreen - self.eager, offscreen),
+            f"{self.eager} of {offscreen} likely offscreen images/iframes lack loading=\"lazy\".",
+            media=self.media, offscreen=offscreen, eager=self.eager,
+        )}
+
+
+VENDOR_PREFIX_PATTERN = re.compile(r'(?<![\w-])-(?:webkit|moz|ms|o)-[a-z-]+\s*:', re.IGNORECASE)
+
+
+@register_visitor
+class ExperimentalCSSVisitor(HTMLVisitor):
+    metrics = ("Transitional/Experimental CSS Properties Check",)
+    wants_data = True
+
+    def __init__(self):
+        super().__init__()
+        self.in_style = False
+        self.tail = ''
+        self.prefixed = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'style':
+            self.in_style, self.tail = True, ''
+        elif attrs.get('style'):
+            self._scan(attrs['style'])
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self.in_style = False
+
+    def handle_data(self, data):
+        if self.in_style:
+            # Keep a short tail so a declaration split across chunks is still matched once.
+            text = self.tail + data
+            matches = list(VENDOR_PREFIX_PATTERN.finditer(text))
+            fresh = [m for m in matches if m.end() > len(self.tail)]
+            self._count(fresh)
+            self.tail = text[-64:]
+
+    def _scan(self, text: str):
+        self._count(list(VENDOR_PREFIX_PATTERN.finditer(text)))
+
+    def _count(self, matches: list):
+        self.prefixed += len(matches)
+        for match in matches[:MAX_SAMPLES - len(self.samples)]:
+            self._sample(match.group(0).rstrip(': '))
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_count(self.prefixed, (0, 5, 20)),
+            f"{self.prefixed} vendor-prefixed CSS declarations found; prefer standard properties."
+            + _examples(self.samples),
+            prefixed=self.prefixed,
+        )}
+
+
+@register_visitor
+class CleanCodeVisitor(HTMLVisitor):
+    metrics = ("Clean Code Structure and Maintainability",)
+
+    def __init__(self):
+        super().__init__()
+        self.elements = self.inline = 0
+        self.inline_styles = self.inline_handlers = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.elements += 1
+        styled = bool(attrs.get('style'))
+        handlers = any(name.startswith('on') for name in attrs)
+        self.inline_styles += styled
+        self.inline_handlers += handlers
+        self.inline += styled or handlers
+
+    def results(self):
+        return {self.metrics[0]: self._result(
+            status_from_ratio(self.elements - self.inline, self.elements),
+            f"{self.inline} of {self.elements} elements use inline styles or event handlers.",
+            elements=self.elements, inline_styles=self.inline_styles, inline_handlers=self.inline_handlers,
+        )}
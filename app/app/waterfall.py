@@ -0,0 +1,503 @@
+# /app/app/waterfall.py
+
+"""
+Subresource waterfall engine used by the Performance metrics.
+
+Fetches a page, discovers its scripts, stylesheets, images and fonts, then fetches
+those concurrently over pooled HTTP/1.1 keep-alive connections. Every response body is
+streamed; only the first MAX_BODY_BYTES of each are kept in memory.
+"""
+
+import codecs
+import http.client
+import ipaddress
+import re
+import socket
+import ssl
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlsplit
+
+from .html_analyzer import HTMLVisitor, StreamingHTMLAnalyzer
+
+try:
+    import brotli  # Optional: only advertise and decode 'br' when available
+except ImportError:
+    brotli = None
+
+# --- Engine Limits ---
+MAX_WORKERS = 8               # Concurrent subresource fetches
+MAX_RESOURCES = 150           # Subresources fetched per page
+MAX_BODY_BYTES = 256 * 1024   # Body bytes kept in memory per resource
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+REQUEST_TIMEOUT = 10          # Seconds, per socket operation
+TIME_BUDGET = 20              # Seconds for the whole waterfall; stays under gunicorn's 30 s worker timeout
+CHUNK_SIZE = 16 * 1024
+
+USER_AGENT = "TheWebForAudit/1.0 (+waterfall)"
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli else "gzip, deflate"
+
+FONT_EXTENSIONS = ('.woff2', '.woff', '.ttf', '.otf', '.eot')
+CSS_URL_PATTERN = re.compile(r"""url\(\s*['"]?([^'")\s]+)['"]?\s*\)""", re.IGNORECASE)
+CHARSET_PATTERN = re.compile(r"""charset\s*=\s*['"]?([\w.:-]+)""", re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """Adds a missing scheme and repairs 'https:/host' as produced by path routing."""
+    url = url.strip()
+    match = re.match(r'^(https?):/+', url, re.IGNORECASE)
+    if match:
+        return f"{match.group(1).lower()}://{url[match.end():]}"
+    return f"https://{url}"
+
+
+class BlockedAddressError(OSError):
+    """Raised when a host resolves to a private, loopback, link-local or otherwise non-public address."""
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of idle keep-alive connections keyed by (scheme, host, port).
+
+    Every connection shares the pool's deadline: when it passes, a watchdog shuts down
+    all open sockets so no blocking read can outlive the budget. Unless `allow_private`
+    is set, hosts are resolved and refused before connecting if any address is non-public.
+    """
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT, time_budget: float = TIME_BUDGET,
+                 allow_private: bool = False):
+        self.timeout = timeout
+        self.deadline = time.perf_counter() + time_budget
+        self.allow_private = allow_private
+        self._idle = {}
+        self._sockets = set()
+        self._expired = False
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self._watchdog = threading.Timer(time_budget, self._expire)
+        self._watchdog.daemon = True
+        self._watchdog.start()
+
+    def _expire(self):
+        with self._lock:
+            self._expired = True
+            sockets = list(self._sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def track(self, sock):
+        """Registers a connected socket so the watchdog can shut it down at the deadline."""
+        with self._lock:
+            self._sockets.add(sock)
+            expired = self._expired
+        if expired:
+            sock.shutdown(socket.SHUT_RDWR)
+
+    def expired(self) -> bool:
+        return self._expired or self.deadline <= time.perf_counter()
+
+    def remaining(self) -> float:
+        """Seconds left in the time budget; raises TimeoutError once it is spent."""
+        remaining = self.deadline - time.perf_counter()
+        if remaining <= 0:
+            raise TimeoutError("Waterfall time budget exhausted")
+        return remaining
+
+    def _create_connection(self, address, timeout=None, source_address=None):
+        """Replacement for socket.create_connection that connects only to vetted addresses."""
+        host, port = address
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        if not self.allow_private:
+            for *_, sockaddr in infos:
+                if not _is_public(sockaddr[0]):
+                    raise BlockedAddressError(f"Refusing non-public address {sockaddr[0]} for {host}")
+
+        # Connect to the resolved address itself so a second DNS lookup cannot swap it.
+        error = None
+        for family, sock_type, proto, _, sockaddr in infos:
+            sock = socket.socket(family, sock_type, proto)
+            try:
+                sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                error = e
+                sock.close()
+        raise error or OSError(f"Could not resolve {host}")
+
+    @staticmethod
+    def _key(url: str) -> tuple:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if scheme == 'https' else 80)
+        return scheme, parts.hostname, port
+
+    def acquire(self, url: str):
+        """Returns (key, connection, reused). New connections are not yet connected."""
+        key = self._key(url)
+        timeout = min(self.timeout, self.remaining())
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.sock.settimeout(timeout)
+                return key, conn, True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        # http.client opens its socket through this attribute; route it via the address check.
+        conn._create_connection = self._create_connection
+        return key, conn, False
+
+    def release(self, key: tuple, conn):
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    def close(self):
+        self._watchdog.cancel()
+        with self._lock:
+            self._sockets.clear()
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+class _StreamDecoder:
+    """Incrementally decodes an identity/gzip/deflate (and br, if available) body."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.supported = encoding in ('', 'identity', 'gzip', 'deflate') or (encoding == 'br' and brotli is not None)
+        self._decoder = None
+        if encoding in ('gzip', 'deflate'):
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS)
+            self._errors = (zlib.error,)
+        elif encoding == 'br' and brotli is not None:
+            self._decoder = brotli.Decompressor()
+            self._errors = (brotli.error,)
+
+    def decode(self, chunk: bytes) -> bytes:
+        if not self.supported:
+            return b''
+        if self._decoder is None:
+            return chunk
+        try:
+            if self.encoding == 'br':
+                return self._decoder.process(chunk)
+            return self._decoder.decompress(chunk)
+        except self._errors:
+            self.supported = False
+            return b''
+
+
+class ResourceDiscoveryVisitor(HTMLVisitor):
+    """Collects subresource URLs, in document order, during the page's analyzer pass."""
+    tags = frozenset({'script', 'link', 'img'})
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = None
+        self.resources = []
+        self._seen = set()
+
+    def begin(self, analyzer):
+        self.analyzer = analyzer
+
+    def _add(self, url, resource_type: str):
+        if not url or len(self.resources) >= MAX_RESOURCES:
+            return
+        absolute = urljoin(self.analyzer.base_url, url.strip())
+        if urlsplit(absolute).scheme not in ('http', 'https'):
+            return
+        absolute = absolute.split('#', 1)[0]
+        if absolute in self._seen:
+            return
+        self._seen.add(absolute)
+        self.resources.append({"url": absolute, "type": resource_type})
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'script':
+            self._add(attrs.get('src'), 'script')
+        elif tag == 'link':
+            rel = attrs.get('rel', '').lower().split()
+            if 'stylesheet' in rel:
+                self._add(attrs.get('href'), 'stylesheet')
+            elif 'preload' in rel and attrs.get('as', '').lower() == 'font':
+                self._add(attrs.get('href'), 'font')
+        elif tag == 'img':
+            self._add(attrs.get('src'), 'image')
+
+
+def _fetch(pool: ConnectionPool, url: str, origin: float, max_body: int = MAX_BODY_BYTES,
+           on_chunk=None) -> dict:
+    """
+    Fetches a single URL, following redirects, and returns its timing record.
+    The body is streamed; at most `max_body` bytes are kept in record['body'].
+    """
+    record = {
+        "url": url, "final_url": url, "status": None, "redirects": 0,
+        "start_ms": round((time.perf_counter() - origin) * 1000, 2),
+        "connect_ms": 0.0, "wait_ms": None, "ttfb_ms": None, "duration_ms": None,
+        "transfer_size": 0, "truncated": False, "connection_reused": False,
+        "content_type": "", "charset": "", "content_encoding": "", "cache_control": "",
+        "expires": "", "date": "", "etag": "", "last_modified": "", "error": None,
+    }
+    started = time.perf_counter()
+    body = bytearray()
+    conn = None
+
+    try:
+        current = url
+        while True:
+            response, key, conn, reused, connect_s, sent, first_byte = _send(pool, current)
+            redirect = response.status in REDIRECT_STATUSES and response.getheader('Location')
+            if redirect and record["redirects"] < MAX_REDIRECTS:
+                _drain(response)
+                _finish(pool, key, conn, response)
+                conn = None
+                record["redirects"] += 1
+                current = urljoin(current, response.getheader('Location'))
+                continue
+            break
+
+        content_type = response.getheader('Content-Type') or ''
+        charset = CHARSET_PATTERN.search(content_type)
+        record.update({
+            "final_url": current,
+            "status": response.status,
+            "connection_reused": reused,
+            "connect_ms": round(connect_s * 1000, 2),
+            "wait_ms": round((first_byte - sent) * 1000, 2),
+            "ttfb_ms": round((first_byte - started) * 1000, 2),
+            "content_type": content_type.split(';')[0].strip().lower(),
+            "charset": charset.group(1).lower() if charset else '',
+            "content_encoding": (response.getheader('Content-Encoding') or '').strip().lower(),
+            "cache_control": response.getheader('Cache-Control') or '',
+            "expires": response.getheader('Expires') or '',
+            "date": response.getheader('Date') or '',
+            "etag": response.getheader('ETag') or '',
+            "last_modified": response.getheader('Last-Modified') or '',
+        })
+        if redirect:
+            # Still redirecting after MAX_REDIRECTS hops; the stub is not the resource.
+            _drain(response)
+            _finish(pool, key, conn, response)
+            conn = None
+            raise http.client.HTTPException(f"Too many redirects (more than {MAX_REDIRECTS})")
+
+        while True:
+            chunk = _read_chunk(response)
+            if not chunk:
+                break
+            pool.remaining()  # Raises once the time budget is spent
+            record["transfer_size"] += len(chunk)
+            if on_chunk:
+                on_chunk(chunk, record)
+            room = max_body - len(body)
+            if room > 0:
+                body += chunk[:room]
+            if max_body and len(chunk) > room:
+                record["truncated"] = True
+        if pool.expired():
+            # The watchdog's shutdown ends the body like an EOF; don't report it as complete.
+            raise TimeoutError("Waterfall time budget exhausted")
+        _finish(pool, key, conn, response)
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        if conn is not None:
+            conn.close()
+        if pool.expired() and not isinstance(e, TimeoutError):
+            e = TimeoutError(f"Waterfall time budget exhausted ({type(e).__name__})")
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    record["body"] = bytes(body)
+    return record
+
+
+def _send(pool: ConnectionPool, url: str):
+    """Sends a GET on a pooled connection, retrying once if a reused socket went stale."""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += f"?{parts.query}"
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING, "Accept": "*/*"}
+
+    for attempt in range(2):
+        key, conn, reused = pool.acquire(url)
+        connect_s = 0.0
+        try:
+            if conn.sock is None:
+                connect_started = time.perf_counter()
+                conn.connect()
+                connect_s = time.perf_counter() - connect_started
+                pool.track(conn.sock)
+            conn.request('GET', path, headers=headers)
+            sent = time.perf_counter()
+            response = conn.getresponse()
+            return response, key, conn, reused, connect_s, sent, time.perf_counter()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused or attempt:
+                raise
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+
+
+def _read_chunk(response) -> bytes:
+    """
+    Reads with a single recv, so callers can check the budget however slowly bytes arrive.
+    read1 leaves a fully read Content-Length body open; close it so the connection is reusable.
+    """
+    chunk = response.read1(CHUNK_SIZE)
+    if not chunk and not response.isclosed():
+        response.close()
+    return chunk
+
+
+def _drain(response):
+    while _read_chunk(response):
+        pass
+
+
+def _finish(pool: ConnectionPool, key: tuple, conn, response):
+    """Returns the connection to the pool unless the server asked to close it."""
+    if response.will_close:
+        conn.close()
+    else:
+        pool.release(key, conn)
+
+
+def _font_urls(stylesheet: dict) -> list:
+    """Extracts font URLs from the retained (possibly compressed) stylesheet body."""
+    decoder = _StreamDecoder(stylesheet.get("content_encoding", ''))
+    body = decoder.decode(stylesheet.get("body") or b'')
+    if not decoder.supported:
+        return []
+
+    text = body.decode('utf-8', errors='replace')
+    base = stylesheet["final_url"]
+    urls = []
+    for match in CSS_URL_PATTERN.finditer(text):
+        absolute = urljoin(base, match.group(1))
+        if urlsplit(absolute).path.lower().endswith(FONT_EXTENSIONS):
+            urls.append(absolute)
+    return urls
+
+
+def build_waterfall(url: str, max_workers: int = MAX_WORKERS, max_body: int = MAX_BODY_BYTES,
+                    visitors: list = (), time_budget: float = TIME_BUDGET, allow_private: bool = False) -> dict:
+    """
+    Fetches the page and all discovered subresources and returns:
+        {"page": <record>, "resources": [<record>, ...], "error": str | None, "html_error": str | None}
+    Records do not include retained bodies, so the result can be serialised as-is.
+
+    Extra html_analyzer visitors may be passed in; they share the single parse of the
+    streamed page used for resource discovery. `html_error` is set when the page body
+    was fetched but could not be analyzed, so their results should not be trusted.
+
+    Everything, page included, must finish within `time_budget` seconds; fetches still
+    queued when it runs out are recorded with an error. Hosts resolving to non-public
+    addresses are refused unless `allow_private` is set.
+    """
+    url = normalize_url(url)
+    pool = ConnectionPool(time_budget=time_budget, allow_private=allow_private)
+    origin = time.perf_counter()
+    discovery = ResourceDiscoveryVisitor()
+    analyzer = StreamingHTMLAnalyzer(url, [discovery] + list(visitors))
+    decoder = {}
+
+    def feed_page(chunk: bytes, record: dict):
+        # Analysis runs on the streamed page, so the full HTML is never held in memory.
+        if not decoder:
+            decoder["page"] = _StreamDecoder(record["content_encoding"])
+            try:
+                text_decoder = codecs.getincrementaldecoder(record["charset"] or 'utf-8')
+            except LookupError:
+                text_decoder = codecs.getincrementaldecoder('utf-8')  # Unknown charset label
+            decoder["text"] = text_decoder(errors='replace')
+            analyzer.page_url = record["final_url"]
+        if "html_error" in decoder:
+            return
+        try:
+            analyzer.feed(decoder["text"].decode(decoder["page"].decode(chunk)))
+        except Exception as e:
+            # A parser failure is not a network failure; keep fetching, but flag the analysis.
+            decoder["html_error"] = f"HTML analysis failed ({type(e).__name__}: {e})"
+
+    try:
+        page = _fetch(pool, url, origin, max_body=0, on_chunk=feed_page)
+        page.pop("body", None)
+        page["type"] = "document"
+
+        if page["error"] or not page["status"] or page["status"] >= 400:
+            return {"page": page, "resources": [], "error": page["error"] or f"HTTP {page['status']}",
+                    "html_error": None}
+        if decoder and not decoder["page"].supported:
+            # Without a readable body nothing can be discovered; report it rather than an empty waterfall.
+            return {"page": page, "resources": [], "html_error": None,
+                    "error": f"Undecodable page body (Content-Encoding: {page['content_encoding']})"}
+
+        html_error = decoder.get("html_error")
+        if html_error is None:
+            try:
+                analyzer.close()
+            except Exception as e:
+                html_error = f"HTML analysis failed ({type(e).__name__}: {e})"
+        if html_error is None and page["content_type"] and 'html' not in page["content_type"]:
+            html_error = f"Page is not HTML ({page['content_type']})"
+        if html_error is None and not analyzer.chars_fed:
+            html_error = "Page body is empty"
+
+        discovered = discovery.resources
+        known = {item["url"] for item in discovered}
+        resources = []
+        pending = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            def submit(resource_url, resource_type):
+                future = executor.submit(_fetch, pool, resource_url, origin, max_body)
+                pending[future] = resource_type
+
+            for item in discovered:
+                submit(item["url"], item["type"])
+
+            # Fonts referenced from a stylesheet are queued as soon as that stylesheet arrives.
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    record["type"] = pending.pop(future)
+                    if record["type"] == "stylesheet" and not record["error"]:
+                        for font_url in _font_urls(record):
+                            if font_url not in known and len(known) < MAX_RESOURCES:
+                                known.add(font_url)
+                                submit(font_url, "font")
+                    record.pop("body", None)
+                    resources.append(record)
+
+        resources.sort(key=lambda r: r["start_ms"])
+
+        return {"page": page, "resources": resources, "error": None, "html_error": html_error}
+    finally:
+        pool.close()
@@ -0,0 +1,95 @@
+"""
+Benchmarks the streaming HTML analyzer on large synthetic pages.
+
+Reports throughput and peak Python memory per page size for two page shapes: many
+small elements, and one large inline <script> blob (as with __NEXT_DATA__). Peak memory
+should stay flat as pages grow because the document is fed in chunks and never held whole.
+
+    python bench_html_analyzer.py [size_mb ...]
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+
+# Make the application package importable when run from the project root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from app.html_analyzer import analyze_html, create_visitors
+
+CHUNK_SIZE = 64 * 1024
+
+HEAD = (
+    '<!DOCTYPE html><html lang="en"><head><title>Synthetic benchmark page</title>'
+    '<meta name="description" content="A large generated page used to benchmark the streaming analyzer.">'
+    '<meta name="viewport" content="width=device-width, initial-scale=1">'
+    '<link rel="canonical" href="https://example.com/bench"><link rel="icon" href="/favicon.ico">'
+    '<style>@media (max-width: 600px) { .card { -webkit-box-flex: 1; } }</style></head>'
+    '<body><header><nav><a href="/">Home</a><a href="/products?id=7">Products</a></nav></header><main><h1>Bench</h1>'
+)
+BLOCK = (
+    '<section><h2>Section {i}</h2><p class="card" style="color: #333">Paragraph {i} with '
+    '<a href="/articles/post-{i}">a link</a> &amp; some text.</p>'
+    '<img src="/img/{i}.jpg" alt="Picture {i}" loading="lazy"><img src="/img/{i}-deco.png" alt="">'
+    '<form><label for="f{i}">Field</label><input id="f{i}" name="f{i}"><select aria-label="Choice">'
+    '<option>a</option></select><button onclick="go({i})">Go</button></form>'
+    '<div role="region" aria-labelledby="h{i}"><ul><li>One</li><li>Two</li></ul></div></section>'
+)
+TAIL = '</main><footer>Footer</footer><script src="https://cdn.example.net/app.js"></script></body></html>'
+
+
+def synthetic_chunks(size_bytes: int):
+    """Yields CHUNK_SIZE pieces of a generated page of roughly `size_bytes`."""
+    buffer, produced, i = [HEAD], len(HEAD), 0
+    buffered = produced
+    while produced < size_bytes:
+        block = BLOCK.format(i=i)
+        buffer.append(block)
+        produced += len(block)
+        buffered += len(block)
+        i += 1
+        if buffered >= CHUNK_SIZE:
+            text = ''.join(buffer)
+            for start in range(0, len(text) - CHUNK_SIZE + 1, CHUNK_SIZE):
+                yield text[start:start + CHUNK_SIZE]
+            rest = text[len(text) - len(text) % CHUNK_SIZE:]
+            buffer, buffered = [rest], len(rest)
+    buffer.append(TAIL)
+    yield ''.join(buffer)
+
+
+def inline_script_chunks(size_bytes: int):
+    """Yields a page whose body is almost entirely one inline JSON <script> of `size_bytes`."""
+    yield HEAD + '<script id="__NEXT_DATA__" type="application/json">{"props": ['
+    item = '{"id": 1, "title": "Synthetic <b>item</b>", "tags": ["a", "b"]},'
+    piece = item * (CHUNK_SIZE // len(item))
+    for _ in range(max(1, size_bytes // len(piece))):
+        yield piece
+    yield '{}]}</script>' + TAIL
+
+
+def run(label: str, pages, size_mb: float):
+    size_bytes = int(size_mb * 1024 * 1024)
+
+    # Timed and memory-traced separately: tracemalloc slows the parser several-fold.
+    started = time.perf_counter()
+    results = analyze_html(pages(size_bytes), 'https://example.com/bench', create_visitors())
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    analyze_html(pages(size_bytes), 'https://example.com/bench', create_visitors())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<14}{size_mb:>6.1f} MB  {elapsed:7.2f} s  {size_mb / elapsed:7.2f} MB/s  "
+          f"peak {peak / 1024:8.1f} KiB  {len(results)} metrics")
+
+
+if __name__ == '__main__':
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 5, 10]
+    print(f"{len(create_visitors())} visitors, {CHUNK_SIZE // 1024} KiB chunks")
+    for size in sizes:
+        run('elements', synthetic_chunks, size)
+    for size in sizes:
+        run('inline script', inline_script_chunks, size)
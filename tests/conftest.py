@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the application package importable as `app` (it lives in app/app/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
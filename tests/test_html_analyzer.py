@@ -0,0 +1,295 @@
+import pytest
+
+from app import html_analyzer
+from app.audit_service import AuditService
+from app.html_analyzer import (
+    HTMLVisitor, StreamingHTMLAnalyzer, analyze_html, create_visitors, metric_names,
+)
+from app.waterfall import ResourceDiscoveryVisitor
+
+PAGE_URL = 'https://example.com/shop/page'
+
+DOCUMENT = """<!DOCTYPE html>
+<html lang="en-GB"><head>
+<title>Handmade ceramics &amp; pottery</title>
+<meta name="description" content="Browse handmade ceramic mugs, bowls and plates, glazed and fired in our studio.">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<link rel="canonical" href="https://example.com/shop/page">
+<link rel="icon" href="/favicon.ico"><link rel="apple-touch-icon" sizes="180x180" href="/touch.png">
+<style>@media (max-width: 600px) { .card { -webkit-box-flex: 1; -moz-box-flex: 1; } }</style>
+<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Store"}</script>
+</head><body>
+<header><nav><a href="/shop/mugs">Mugs</a><a href="/item?id=42">Item</a></nav></header>
+<main>
+<h1>Ceramics</h1><h2>Mugs</h2><h4>Skipped</h4>
+<svg role="img" aria-label="Logo"><title>Logo in svg</title></svg>
+<img src="/a.jpg" alt="Blue mug"><img src="/b.jpg" alt=""><img src="/c.jpg"><img src="/d.jpg" loading="lazy">
+<img src="/e.jpg">
+<form><label>Name <input name="name"></label><input id="email"><input id="phone"><input type="submit">
+<select id="size"></select></form>
+<label for="email">Email</label>
+<div role="banner" aria-colour="red">Bad ARIA</div><div role="navigation" aria-label="Secondary">Ok</div>
+<div onclick="buy()" style="color: red">Buy</div><a tabindex="2" href="/x">Promo</a>
+<center>Old</center>
+<script src="https://cdn.example.net/lib.js"></script><script src="/local.js"></script>
+</main><footer>Footer</footer></body></html>
+"""
+
+
+def analyze(document=DOCUMENT, chunk_size=None, page_url=PAGE_URL):
+    if chunk_size:
+        chunks = [document[i:i + chunk_size] for i in range(0, len(document), chunk_size)]
+    else:
+        chunks = [document]
+    return analyze_html(chunks, page_url)
+
+
+@pytest.fixture(scope='module')
+def results():
+    return analyze()
+
+
+def status(results, metric):
+    return results[metric]["status"]
+
+
+def test_every_metric_has_one_structured_result(results):
+    assert sorted(results) == sorted(metric_names())
+    for metric, result in results.items():
+        assert result["metric"] == metric
+        assert result["status"] in ('Excellent', 'Good', 'Fair', 'Poor', 'N/A')
+        assert isinstance(result["suggestion"], str) and isinstance(result["details"], dict)
+
+
+def test_results_identical_when_fed_one_character_at_a_time(results):
+    assert analyze(chunk_size=1) == results
+    assert analyze(chunk_size=7) == results
+
+
+def test_image_alt(results):
+    alt = results["Alt Text on All Images (Informative vs. Decorative)"]
+    assert alt["details"] == {"images": 5, "missing": 3, "decorative": 1}
+    assert alt["status"] == 'Poor'
+    seo = results["Image Alt Attributes for SEO"]
+    assert seo["details"]["informative"] == 1 and seo["status"] == 'Poor'
+
+
+def test_non_text_content(results):
+    # 5 images plus the labelled svg; the 3 images without alt fail
+    assert results["Non-Text Content Alternatives"]["details"] == {"elements": 6, "missing": 3}
+
+
+def test_aria(results):
+    aria = results["ARIA Roles and Attributes Correctly Used"]
+    assert aria["details"] == {"elements": 3, "invalid": 1}
+    assert 'aria-colour' in aria["suggestion"]
+
+
+def test_keyboard_navigation(results):
+    keyboard = results["Full Keyboard Navigation Support"]
+    assert keyboard["details"]["issues"] == 2
+    assert 'tabindex="2"' in keyboard["suggestion"]
+
+
+@pytest.mark.parametrize('tabindex', ['²', 'abc', '', '-1', '0'])
+def test_keyboard_navigation_ignores_non_positive_tabindex(tabindex):
+    results = analyze(f'<div tabindex="{tabindex}">x</div>')
+    keyboard = results["Full Keyboard Navigation Support"]
+    assert keyboard["status"] == 'Excellent'
+    assert keyboard["details"] == {"interactive": 1, "issues": 0}
+
+
+def test_semantic_structure(results):
+    assert status(results, "Semantic HTML Structure") == 'Excellent'
+    assert status(analyze('<div><main>x</main></div>'), "Semantic HTML Structure") == 'Poor'
+
+
+def test_form_labels_resolve_label_for_after_control(results):
+    labels = results["Form Labels Associated with Controls"]
+    # name (wrapped), email (label for after the control); phone and size are unlabelled
+    assert labels["details"] == {"controls": 4, "labelled": 2, "untracked": 0}
+    assert labels["status"] == 'Fair'
+
+
+def test_form_labels_label_before_control():
+    results = analyze('<label for="q">Search</label><input id="q"><textarea aria-label="Notes"></textarea>')
+    assert status(results, "Form Labels Associated with Controls") == 'Excellent'
+
+
+def test_headings(results):
+    assert status(results, "Heading Structure Logical (<H1> present and unique)") == 'Excellent'
+    hierarchy = results["Heading Tags Hierarchy (H1, H2, H3)"]
+    assert hierarchy["details"] == {"headings": 3, "skipped_levels": 1}
+    assert 'h2 -> h4' in hierarchy["suggestion"]
+    assert status(analyze('<h2>a</h2>'), "Heading Structure Logical (<H1> present and unique)") == 'Poor'
+    assert status(analyze('<h1>a</h1><h1>b</h1>'), "Heading Structure Logical (<H1> present and unique)") == 'Fair'
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<html lang="en-GB">', 'Excellent'),
+    ('<html lang="english language">', 'Fair'),
+    ('<html>', 'Poor'),
+])
+def test_language(html, expected):
+    assert status(analyze(html), "Page Language Specified (lang attribute)") == expected
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<meta name="description" content="%s">' % ('d' * 80), 'Excellent'),
+    ('<meta name="description" content="%s">' % ('d' * 200), 'Good'),
+    ('<meta name="description" content="short">', 'Fair'),
+    ('<meta name="description" content="%s"><meta name="description" content="x">' % ('d' * 80), 'Fair'),
+    ('<meta name="description" content="">', 'Poor'),
+    ('', 'Poor'),
+])
+def test_meta_description(html, expected):
+    assert status(analyze(html), "Meta Description Present and Unique") == expected
+
+
+def test_title_ignores_svg_title(results):
+    title = results["Title Tag Length and Relevance"]
+    assert title["details"] == {"title": "Handmade ceramics & pottery", "count": 1}
+    assert title["status"] == 'Excellent'
+    only_svg = analyze('<svg><title>Icon</title></svg>')
+    assert status(only_svg, "Title Tag Length and Relevance") == 'Poor'
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<link rel="canonical" href="https://example.com/">', 'Excellent'),
+    ('<link rel="canonical" href="/page">', 'Good'),
+    ('', 'Fair'),
+    ('<link rel="canonical" href="https://a.com/"><link rel="canonical" href="https://b.com/">', 'Poor'),
+])
+def test_canonical(html, expected):
+    assert status(analyze(html), "Canonical Tags Correctly Used") == expected
+
+
+def test_viewport_and_responsive(results):
+    assert status(results, "Mobile Friendly / Viewport Configured") == 'Excellent'
+    assert status(results, "Responsive Design (Adapts to different screen sizes)") == 'Good'
+    locked = analyze('<meta name="viewport" content="width=device-width, user-scalable=no">')
+    assert status(locked, "Mobile Friendly / Viewport Configured") == 'Good'
+    assert status(analyze(''), "Mobile Friendly / Viewport Configured") == 'Poor'
+    assert status(analyze(''), "Responsive Design (Adapts to different screen sizes)") == 'Poor'
+
+
+def test_structured_data(results):
+    assert status(results, "Structured Data (Schema Markup) Implemented") == 'Excellent'
+    invalid = analyze('<script type="application/ld+json">{"a": </script>')
+    assert status(invalid, "Structured Data (Schema Markup) Implemented") == 'Fair'
+    microdata = analyze('<div itemscope itemtype="https://schema.org/Product"></div>')
+    assert status(microdata, "Structured Data (Schema Markup) Implemented") == 'Good'
+
+
+def test_descriptive_urls(results):
+    urls = results["Descriptive URL Structure"]
+    assert urls["details"] == {"internal_links": 3, "non_descriptive": 1}
+    assert '/item?id=42' in urls["suggestion"]
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<!DOCTYPE html><html>', 'Excellent'),
+    ('<!doctype HTML>', 'Excellent'),
+    ('<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"><html>', 'Fair'),
+    ('<html><!DOCTYPE html>', 'Poor'),
+    ('<html>', 'Poor'),
+])
+def test_doctype(html, expected):
+    assert status(analyze(html), "HTML Doctype Declared") == expected
+
+
+def test_deprecated_markup(results):
+    assert results["No Deprecated APIs or Frameworks"]["details"] == {"issues": 1}
+    legacy = analyze('<script src="/js/jquery-1.7.2.min.js"></script>' + '<font>x</font>' * 3)
+    assert legacy["No Deprecated APIs or Frameworks"]["details"] == {"issues": 4}
+    assert status(legacy, "No Deprecated APIs or Frameworks") == 'Fair'
+
+
+def test_favicon(results):
+    assert status(results, "Favicon Present (all sizes)") == 'Excellent'
+    assert status(analyze('<link rel="shortcut icon" href="/f.ico">'), "Favicon Present (all sizes)") == 'Good'
+    assert status(analyze(''), "Favicon Present (all sizes)") == 'Poor'
+
+
+def test_third_party_scripts(results):
+    scripts = results["Third-Party Scripts Scanned for Security"]
+    assert scripts["details"] == {"third_party": 1, "without_integrity": 1}
+    with_sri = analyze('<script src="https://cdn.example.net/lib.js" integrity="sha384-x"></script>')
+    assert status(with_sri, "Third-Party Scripts Scanned for Security") == 'Excellent'
+
+
+def test_lazy_loading(results):
+    lazy = results["Lazy Loading for Offscreen Images/Iframes"]
+    # The first three images count as above the fold; d.jpg is lazy, e.jpg is not
+    assert lazy["details"] == {"media": 5, "offscreen": 2, "eager": 1}
+    assert lazy["status"] == 'Fair'
+
+
+def test_experimental_css_counts_split_declarations_once(results):
+    assert results["Transitional/Experimental CSS Properties Check"]["details"] == {"prefixed": 2}
+    css = '<style>' + 'a { -webkit-transition: none; } ' * 50 + '</style><p style="-ms-zoom: 1">x</p>'
+    for chunk_size in (None, 1, 5, 13):
+        prefixed = analyze(css, chunk_size)["Transitional/Experimental CSS Properties Check"]
+        assert prefixed["details"] == {"prefixed": 51}
+
+
+def test_clean_code(results):
+    clean = results["Clean Code Structure and Maintainability"]
+    assert clean["details"]["inline_styles"] == 1
+    assert clean["details"]["inline_handlers"] == 1
+
+
+def test_base_href_is_shared_by_url_visitors():
+    discovery = ResourceDiscoveryVisitor()
+    analyzer = StreamingHTMLAnalyzer(PAGE_URL, [discovery] + create_visitors())
+    analyzer.feed(
+        '<base href="https://cdn.other.net/assets/"><base href="/ignored/">'
+        '<script src="app.js"></script><a href="/shop/mugs">Mugs</a>'
+    )
+    analyzer.close()
+    results = analyzer.results()
+
+    assert analyzer.base_url == 'https://cdn.other.net/assets/'
+    assert discovery.resources == [{"url": "https://cdn.other.net/assets/app.js", "type": "script"}]
+    assert results["Third-Party Scripts Scanned for Security"]["details"]["third_party"] == 1
+    assert results["Descriptive URL Structure"]["details"]["internal_links"] == 0
+
+
+def test_large_inline_script_is_flushed_in_pieces():
+    analyzer = StreamingHTMLAnalyzer(PAGE_URL, create_visitors())
+    analyzer.feed('<title>Big page title</title><script>')
+    for _ in range(64):
+        analyzer.feed('var x = "<b>" + 1;\n' * 1000)
+        assert len(analyzer.rawdata) <= html_analyzer.MAX_CDATA_BUFFER + 20_000
+    analyzer.feed('</scr')
+    analyzer.feed('ipt><h1>After</h1>')
+    analyzer.close()
+    results = analyzer.results()
+    assert status(results, "Heading Structure Logical (<H1> present and unique)") == 'Excellent'
+    assert status(results, "Title Tag Length and Relevance") == 'Excellent'
+
+
+class BrokenVisitor(HTMLVisitor):
+    metrics = ("Semantic HTML Structure",)
+    tags = frozenset({'main'})
+
+    def handle_starttag(self, tag, attrs):
+        raise ValueError("boom")
+
+
+def test_failing_visitor_reports_na_without_affecting_others():
+    visitors = [BrokenVisitor(), html_analyzer.HeadingVisitor()]
+    results = analyze_html(['<main><h1>Title</h1></main>'], PAGE_URL, visitors)
+    assert results["Semantic HTML Structure"]["status"] == 'N/A'
+    assert 'ValueError: boom' in results["Semantic HTML Structure"]["suggestion"]
+    assert results["Heading Structure Logical (<H1> present and unique)"]["status"] == 'Excellent'
+
+
+@pytest.mark.parametrize('waterfall', [
+    {"error": "Undecodable page body (Content-Encoding: br)", "html_error": None},
+    {"error": None, "html_error": "Page is not HTML (application/json)"},
+])
+def test_html_metrics_are_na_when_page_not_analyzed(waterfall):
+    checks = AuditService._html_metric_checks(waterfall, create_visitors())
+    assert set(checks) == set(metric_names())
+    assert all(status == 'N/A' for status, _ in checks.values())
@@ -0,0 +1,265 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import waterfall
+from app.html_analyzer import TitleVisitor
+from app.audit_service import WATERFALL_METRICS, AuditService
+
+DELAY = 0.3
+
+PAGE = (
+    b"<!DOCTYPE html><html><head><link rel='stylesheet' href='/style.css'>"
+    b"<script src='/app.js'></script></head><body>"
+    b"<img src='/slow-1.jpg'><img src='/slow-2.jpg'><img src='/slow-3.jpg'><img src='/slow-4.jpg'>"
+    b"</body></html>"
+)
+
+# path -> (status, headers, body, delay)
+ROUTES = {
+    '/': (200, {'Content-Type': 'text/html', 'Content-Encoding': 'gzip'}, gzip.compress(PAGE), 0),
+    '/redirect': (301, {'Location': '/'}, b'', 0),
+    '/loop': (302, {'Location': '/loop'}, b'', 0),
+    '/style.css': (200, {'Content-Type': 'text/css', 'Cache-Control': 'max-age=31536000'},
+                   b"@font-face { src: url('/fonts/body.woff2'); }", 0),
+    '/app.js': (200, {'Content-Type': 'application/javascript'}, b'x' * 100_000, 0),
+    '/fonts/body.woff2': (200, {'Content-Type': 'font/woff2'}, b'f' * 100, 0),
+    '/many': (200, {'Content-Type': 'text/html'},
+              b''.join(b"<img src='/img-%d.webp'>" % i for i in range(10)), 0),
+    '/latin1': (200, {'Content-Type': 'text/html; charset=ISO-8859-1'},
+                '<html><head><title>Café crème</title></head></html>'.encode('latin-1'), 0),
+    '/data.json': (200, {'Content-Type': 'application/json'}, b'{"a": 1}', 0),
+    '/brotli': (200, {'Content-Type': 'text/html', 'Content-Encoding': 'br'}, b'not brotli', 0),
+    '/dripping': (200, {'Content-Type': 'text/html'}, b"<script src='/drip.js'></script><img src='/img-0.webp'>", 0),
+    '/stalled': (200, {'Content-Type': 'text/html'},
+                 b''.join(b"<img src='/stall-%d.jpg'>" % i for i in range(4)), 0),
+}
+for i in range(1, 5):
+    ROUTES[f'/slow-{i}.jpg'] = (200, {'Content-Type': 'image/jpeg'}, b'j' * 100, DELAY)
+for i in range(4):
+    ROUTES[f'/stall-{i}.jpg'] = (200, {'Content-Type': 'image/jpeg'}, b'j' * 100, 2)
+for i in range(10):
+    ROUTES[f'/img-{i}.webp'] = (200, {'Content-Type': 'image/webp'}, b'w' * 100, 0)
+
+
+# Paths whose body is sent one byte every DRIP_INTERVAL, so no single recv ever times out
+DRIP_PATHS = {'/drip.js', '/drip-page'}
+DRIP_INTERVAL = 0.1
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.client_ports.add(self.client_address[1])
+        if self.path in DRIP_PATHS:
+            return self.drip()
+        status, headers, body, delay = ROUTES.get(self.path, (404, {'Content-Type': 'text/plain'}, b'', 0))
+        time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def drip(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', '1000')
+        self.end_headers()
+        try:
+            for _ in range(1000):
+                self.wfile.write(b'x')
+                self.wfile.flush()
+                time.sleep(DRIP_INTERVAL)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    httpd.client_ports = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url_for(server, path):
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+
+def build(server, path, **kwargs):
+    return waterfall.build_waterfall(url_for(server, path), allow_private=True, **kwargs)
+
+
+def by_path(result):
+    return {r["url"].split('/', 3)[3]: r for r in result["resources"]}
+
+
+def test_gzip_page_discovers_all_resource_types(server):
+    result = build(server, '/')
+    assert result["error"] is None
+    resources = by_path(result)
+    assert {path: r["type"] for path, r in resources.items()} == {
+        'style.css': 'stylesheet', 'app.js': 'script', 'fonts/body.woff2': 'font',
+        'slow-1.jpg': 'image', 'slow-2.jpg': 'image', 'slow-3.jpg': 'image', 'slow-4.jpg': 'image',
+    }
+    assert result["page"]["content_encoding"] == 'gzip'
+    assert resources['style.css']["cache_control"] == 'max-age=31536000'
+
+
+def test_subresources_are_fetched_concurrently(server):
+    started = time.perf_counter()
+    result = build(server, '/')
+    elapsed = time.perf_counter() - started
+    slow = [r for r in result["resources"] if 'slow-' in r["url"]]
+    assert len(slow) == 4 and all(r["duration_ms"] >= DELAY * 1000 for r in slow)
+    assert elapsed < 4 * DELAY
+
+
+def test_keep_alive_connections_are_reused(server):
+    result = build(server, '/many', max_workers=1)
+    assert len(result["resources"]) == 10
+    assert all(r["connection_reused"] for r in result["resources"])
+    assert len(server.client_ports) == 1
+
+
+def test_body_cap_marks_truncated(server):
+    pool = waterfall.ConnectionPool(allow_private=True)
+    record = waterfall._fetch(pool, url_for(server, '/app.js'), time.perf_counter(), max_body=1000)
+    pool.close()
+    assert record["transfer_size"] == 100_000
+    assert len(record["body"]) == 1000
+    assert record["truncated"] is True
+
+    result = build(server, '/', max_body=1000)
+    resources = by_path(result)
+    assert result["page"]["truncated"] is False
+    assert resources['app.js']["truncated"] is True
+    assert resources['fonts/body.woff2']["truncated"] is False
+
+
+def test_redirects_are_followed(server):
+    result = build(server, '/redirect')
+    assert result["error"] is None
+    assert result["page"]["redirects"] == 1
+    assert result["page"]["final_url"] == url_for(server, '/')
+    assert len(result["resources"]) == 7
+
+
+def test_redirect_loop_sets_error(server):
+    result = build(server, '/loop')
+    assert result["error"] == f"HTTPException: Too many redirects (more than {waterfall.MAX_REDIRECTS})"
+    assert result["page"]["redirects"] == waterfall.MAX_REDIRECTS
+    assert result["resources"] == []
+
+
+def test_undecodable_page_sets_error(server):
+    result = build(server, '/brotli')
+    assert result["resources"] == []
+    assert result["error"] == "Undecodable page body (Content-Encoding: br)"
+
+
+def test_non_html_page_sets_html_error(server):
+    result = build(server, '/data.json')
+    assert result["error"] is None
+    assert result["html_error"] == "Page is not HTML (application/json)"
+    assert build(server, '/')["html_error"] is None
+
+
+def test_page_is_decoded_with_its_declared_charset(server):
+    title = TitleVisitor()
+    result = build(server, '/latin1', visitors=[title])
+    assert result["page"]["charset"] == 'iso-8859-1'
+    assert ''.join(title.text) == 'Café crème'
+
+
+def test_time_budget_stops_the_waterfall(server):
+    started = time.perf_counter()
+    result = build(server, '/stalled', time_budget=0.5)
+    assert time.perf_counter() - started < 2
+    assert result["resources"]
+    assert all(r["error"] and 'TimeoutError' in r["error"] for r in result["resources"])
+
+
+def test_time_budget_stops_a_dripping_subresource(server):
+    started = time.perf_counter()
+    result = build(server, '/dripping', time_budget=1)
+    assert time.perf_counter() - started < 2
+    resources = by_path(result)
+    assert 'TimeoutError' in resources['drip.js']["error"]
+    assert 0 < resources['drip.js']["transfer_size"] < 1000
+    assert resources['img-0.webp']["error"] is None
+
+
+def test_time_budget_stops_a_dripping_page(server):
+    started = time.perf_counter()
+    result = build(server, '/drip-page', time_budget=1)
+    assert time.perf_counter() - started < 2
+    assert 'TimeoutError' in result["error"]
+
+
+def test_non_public_addresses_are_refused(server):
+    result = waterfall.build_waterfall(url_for(server, '/'))
+    assert result["error"].startswith('BlockedAddressError')
+    assert server.client_ports == set()
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'cache_control': 'public, max-age=600'}, 600),
+    ({'cache_control': 's-maxage=86400'}, 86400),
+    ({'cache_control': 'no-store, max-age=600'}, 0),
+    ({'cache_control': 'no-cache'}, 0),
+    ({'expires': 'Thu, 01 Jan 2026 01:00:00 GMT', 'date': 'Thu, 01 Jan 2026 00:00:00 GMT'}, 3600),
+    ({'expires': 'Thu, 01 Jan 2026 00:00:00 GMT', 'date': 'Thu, 01 Jan 2026 01:00:00 GMT'}, 0),
+    ({'expires': '0', 'date': 'Thu, 01 Jan 2026 00:00:00 GMT'}, 0),
+    ({}, 0),
+])
+def test_cache_ttl_seconds(headers, expected):
+    resource = dict({'cache_control': '', 'expires': '', 'date': ''}, **headers)
+    assert AuditService._cache_ttl_seconds(resource) == expected
+
+
+def resource(**fields):
+    record = {
+        "final_url": "https://example.com/r", "type": "image", "status": 200, "error": None,
+        "content_type": "image/webp", "content_encoding": "", "transfer_size": 100,
+        "cache_control": "max-age=31536000", "expires": "", "date": "",
+    }
+    record.update(fields)
+    return record
+
+
+def test_waterfall_metric_statuses():
+    page = resource(type="document", content_type="text/html", content_encoding="gzip",
+                    transfer_size=5000, ttfb_ms=150, wait_ms=250, redirects=0)
+    resources = [
+        resource(type="script", content_type="application/javascript", transfer_size=5000),
+        resource(type="stylesheet", content_type="text/css", transfer_size=5000, content_encoding="br"),
+        resource(content_type="image/jpeg", cache_control="no-cache"),
+        resource(), resource(), resource(),
+        resource(error="TimeoutError: x", status=None),
+    ]
+    checks = AuditService._waterfall_metric_checks({"page": page, "resources": resources, "error": None})
+
+    assert checks["Time to First Byte (TTFB)"][0] == 'Excellent'
+    assert checks["Server Response Time"][0] == 'Good'
+    assert checks["Resource Compression (Gzip/Brotli)"][0] == 'Fair'                # 2 of 3
+    assert checks["Image Optimization and Next-Gen Formats (WebP)"][0] == 'Good'    # 3 of 4
+    assert checks["Effective Caching Policy"][0] == 'Good'                          # 5 of 6
+
+
+def test_waterfall_metrics_are_na_when_page_fails():
+    checks = AuditService._waterfall_metric_checks({"page": {}, "resources": [], "error": "HTTP 500"})
+    assert set(checks) == set(WATERFALL_METRICS)
+    assert all(status == 'N/A' and 'HTTP 500' in note for status, note in checks.values())